@@ -1,47 +1,67 @@
 import yaml
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-with open("config.yaml") as f:
-    config = yaml.safe_load(f)
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-env = Environment(loader=FileSystemLoader("templates"))
+# Compiled templates for the current worker process, filled by load_templates()
+templates = {}
 
-wg_template = env.get_template("wg.j2")
-bgp_template = env.get_template("bgp.j2")
-route_map_template = env.get_template("route_maps.j2")
-global_template = env.get_template("global.j2")
-common = config.get("global", {})
 
-for node in config["nodes"]:
-    node_name = node["name"]
-    peers = config.get("peers", {}).get(node_name, [])
+def load_templates(common):
+    os.makedirs(".jinja_cache", exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader("templates"),
+        bytecode_cache=FileSystemBytecodeCache(".jinja_cache"),
+        auto_reload=False,
+    )
+    env.globals["common"] = common
 
-    os.makedirs(node_name, exist_ok=True)
+    templates["wg"] = env.get_template("wg.j2")
+    templates["bgp"] = env.get_template("bgp.j2")
+    templates["route_maps"] = env.get_template("route_maps.j2")
+    templates["global"] = env.get_template("global.j2")
+
+
+def render_node(node, peers):
+    outputs = []
 
     for peer in peers:
-        wg_config = wg_template.render(node=node, peer=peer, common=common)
+        wg_config = templates["wg"].render(node=node, peer=peer)
         if peer.get("asn"):
             filename = f"wg{peer['asn']}.conf"
 
-        path = os.path.join(node_name, filename)
-        with open(path, "w") as f:
-            f.write(wg_config)
-        print(f"[+] Generated: {path}")
-
-    global_config_rendered = global_template.render(node=node, common=common)
-    bgp_config = bgp_template.render(node=node, peers=peers, common=common)
-    frr_path = os.path.join(node_name, "frr.conf")
-    with open(frr_path, "w") as f:
-        f.write(global_config_rendered)
-        f.write(bgp_config)
-    print(f"[+] Generated BGP config: {frr_path}")
-
-    route_map_config = route_map_template.render(node=node, peers=peers, common=common)
-    
-    with open(frr_path, "a") as f:
-        f.write("\n")
-        f.write("! Route-maps configuration\n")
-        f.write(route_map_config)
-    
-    print(f"[+] Appended route-maps to: {frr_path}")
\ No newline at end of file
+        outputs.append((filename, wg_config))
+
+    global_config_rendered = templates["global"].render(node=node)
+    bgp_config = templates["bgp"].render(node=node, peers=peers)
+    route_map_config = templates["route_maps"].render(node=node, peers=peers)
+
+    outputs.append((
+        "frr.conf",
+        global_config_rendered
+        + bgp_config
+        + "\n! Route-maps configuration\n"
+        + route_map_config,
+    ))
+
+    return outputs
+
+
+if __name__ == "__main__":
+    config = yaml.load(Path("config.yaml").read_bytes(), Loader=Loader)
+    common = config.get("global", {})
+    nodes = config["nodes"]
+    node_peers = [config.get("peers", {}).get(node["name"], []) for node in nodes]
+
+    # Rendering is CPU-bound and each node is independent, so fan nodes out to
+    # worker processes and write the results from here
+    with ProcessPoolExecutor(initializer=load_templates, initargs=(common,)) as pool:
+        for node, outputs in zip(nodes, pool.map(render_node, nodes, node_peers)):
+            node_dir = Path(node["name"])
+            node_dir.mkdir(exist_ok=True)
+            for filename, content in outputs:
+                (node_dir / filename).write_text(content)
+            print("\n".join(f"[+] Generated: {node_dir / filename}" for filename, _ in outputs))
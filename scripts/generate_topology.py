@@ -1,24 +1,38 @@
 #!/usr/bin/env python3
 """Generate network topology diagrams: geographic map and logical view."""
 
+import copy
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import threading
 import yaml
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.lines import Line2D
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import networkx as nx
 
-try:
-    import cartopy.crs as ccrs
-    import cartopy.feature as cfeature
-    HAS_CARTOPY = True
-except ImportError:
-    HAS_CARTOPY = False
-    print("Warning: cartopy not installed. Install with: pip install cartopy")
-    print("Geographic map will be simplified.")
+# matplotlib and cartopy are imported inside the generators; they are slow to
+# load and only needed once there is something to draw
 
+# Diagrams are only ever rendered straight to PNG; let Agg simplify long paths
+RENDER_RC_PARAMS = {
+    "path.simplify": True,
+    "path.simplify_threshold": 1.0,
+    "agg.path.chunksize": 10000,
+}
+
+# PNG output resolution (override with TOPOLOGY_DPI); encode with fast zlib
+# settings and without the default "Software" metadata chunk
+TOPOLOGY_DPI = int(os.environ.get("TOPOLOGY_DPI", "150"))
+PNG_SAVE_KWARGS = {
+    "metadata": {"Software": None},
+    "pil_kwargs": {"compress_level": 3, "optimize": False},
+}
 
 # Geographic coordinates for locations (longitude, latitude)
 LOCATION_COORDS = {
@@ -58,87 +72,275 @@ LOGICAL_POSITIONS = {
     "sgx": (0.6, -0.3),       # Singapore - Southeast Asia
 }
 
+# Geo map router label placement per location, to avoid overlap:
+# (lon offset, lat offset, ha, va)
+GEO_LABEL_OFFSETS = {
+    "sgx": (-12, 0, 'right', 'center'),     # Singapore - left (inside the map)
+    "frk": (8, 5, 'left', 'bottom'),        # Frankfurt - right and up
+    "lhr": (-8, 3, 'right', 'bottom'),      # London - left
+    "lax": (0, -8, 'center', 'top'),        # LA - below
+    "ewr": (0, -8, 'center', 'top'),        # Newark - below
+}
+GEO_LABEL_OFFSETS_DEFAULT = (0, -8, 'center', 'top')
+
 USMAN_ASN = "4242421869"
 
+# Label box styles (matplotlib copies these into each Text, so sharing is safe)
+ROUTER_LABEL_BBOX = dict(boxstyle='round,pad=0.3', facecolor='white',
+                         edgecolor='#4a90e2', alpha=0.95)
+DOMAIN_LABEL_BBOX = dict(boxstyle='round,pad=0.3', facecolor='white',
+                         edgecolor='#1976d2', alpha=0.95)
+EDGE_LABEL_BBOX_GEO = dict(boxstyle='round,pad=0.15', facecolor='white',
+                           edgecolor='#1565c0', alpha=0.9)
+EDGE_LABEL_BBOX_LOGICAL = dict(boxstyle='round,pad=0.1', facecolor='white',
+                               edgecolor='none', alpha=0.9)
+
+# Prefer the libyaml-backed loader; falls back to the pure-Python one
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Parsed YAML is mirrored here as JSON, keyed by the source file's path
+YAML_CACHE_DIR = Path(__file__).parent.parent / ".cache" / "yaml"
+
+# In-process LRU of parsed YAML: path -> ((mtime_ns, size), data)
+_YAML_CACHE = OrderedDict()
+_YAML_CACHE_MAX = 100
+_YAML_CACHE_LOCK = threading.Lock()
+
+
+def _load_yaml_mirrored(path, key):
+    """Parse a YAML file, reusing its JSON mirror while (mtime, size) match."""
+    cache_file = YAML_CACHE_DIR / f"{hashlib.sha1(str(path).encode()).hexdigest()}.json"
+
+    try:
+        cached = json.loads(cache_file.read_bytes())
+        if cached["key"] == list(key):
+            return cached["data"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    data = yaml.load(path.read_bytes(), Loader=Loader)
+
+    # Only mirror data that survives a JSON round-trip (no dates, int keys, ...)
+    try:
+        encoded = json.dumps({"key": key, "data": data})
+    except TypeError:
+        return data
+    if json.loads(encoded)["data"] != data:
+        return data
+
+    try:
+        YAML_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(encoded)
+        tmp_file.replace(cache_file)
+    except OSError:
+        pass
+
+    return data
+
+
+def load_yaml_cached(path):
+    """Load a YAML file, served from memory or its JSON mirror when unchanged.
+
+    Callers get their own copy and are free to mutate it.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+
+    with _YAML_CACHE_LOCK:
+        entry = _YAML_CACHE.get(path)
+        if entry is not None and entry[0] == key:
+            _YAML_CACHE.move_to_end(path)
+            return copy.deepcopy(entry[1])
+
+    data = _load_yaml_mirrored(path, key)
+
+    with _YAML_CACHE_LOCK:
+        _YAML_CACHE[path] = (key, copy.deepcopy(data))
+        _YAML_CACHE.move_to_end(path)
+        while len(_YAML_CACHE) > _YAML_CACHE_MAX:
+            _YAML_CACHE.popitem(last=False)
+
+    return data
+
+
+def _load_host_vars(base_path, host):
+    """Load a single router's host_vars, or None if it has none."""
+    host_var_path = base_path / "inventory" / "host_vars" / host / "main.yml"
+    try:
+        host_vars = load_yaml_cached(host_var_path)
+    except FileNotFoundError:
+        return None
+    host_vars["hostname"] = host
+    host_vars["_prefix"] = host.partition("-")[0].lower()
+    return host_vars
+
 
 def load_inventory():
     """Load inventory and host variables."""
     base_path = Path(__file__).parent.parent
 
     hosts_file = base_path / "inventory" / "hosts.yml"
-    with open(hosts_file) as f:
-        hosts = yaml.safe_load(f)
-
-    routers = []
-    for host in hosts["all"]["children"]["routers"]["hosts"].keys():
-        host_var_path = base_path / "inventory" / "host_vars" / host / "main.yml"
-        if host_var_path.exists():
-            with open(host_var_path) as f:
-                host_vars = yaml.safe_load(f)
-                host_vars["hostname"] = host
-                routers.append(host_vars)
+    hosts = load_yaml_cached(hosts_file)
+
+    # Each host_vars file is independent; read and parse them concurrently
+    hosts_list = list(hosts["all"]["children"]["routers"]["hosts"])
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(hosts_list)))) as ex:
+        loaded = ex.map(lambda host: _load_host_vars(base_path, host), hosts_list)
+        routers = [host_vars for host_vars in loaded if host_vars is not None]
 
     return routers
 
 
+@functools.lru_cache(maxsize=1)
 def load_global_config():
-    """Load global configuration."""
+    """Load global configuration (parsed once, shared by both diagrams)."""
     base_path = Path(__file__).parent.parent
     global_vars_path = base_path / "inventory" / "group_vars" / "all" / "global.yml"
     if global_vars_path.exists():
-        with open(global_vars_path) as f:
-            return yaml.safe_load(f)
+        return load_yaml_cached(global_vars_path)
     return {}
 
 
-def get_router_coords(hostname):
+def get_router_coords(router):
     """Get coordinates for a router based on its hostname prefix."""
-    prefix = hostname.split("-")[0].lower()
-    return LOCATION_COORDS.get(prefix, LOCATION_COORDS["lhr"])
+    return LOCATION_COORDS.get(router["_prefix"], LOCATION_COORDS["lhr"])
 
 
-def get_logical_position(hostname):
+def get_logical_position(router):
     """Get logical diagram position for a router."""
-    prefix = hostname.split("-")[0].lower()
-    return LOGICAL_POSITIONS.get(prefix, (0, 0))
-
-
-def generate_geo_map(routers, output_file="topology-geo.png"):
-    """Generate geographic map showing internal network on a world map."""
-
-    global_config = load_global_config()
-    intra_network_tunnels = global_config.get("intra_network_tunnels", [])
-
-    # Collect router data
-    router_nodes = []
-    router_positions_geo = {}
-    router_labels = {}
-
-    for router in routers:
-        hostname = router["hostname"]
-        loopback = router.get("loopback", "")
-        coords = get_router_coords(hostname)
-
-        router_nodes.append(hostname)
-        router_positions_geo[hostname] = coords
-        router_labels[hostname] = f"{hostname}\n{loopback}"
+    return LOGICAL_POSITIONS.get(router["_prefix"], (0, 0))
+
+
+@dataclass
+class TopologyModel:
+    """Routers, tunnels and peers shared by both diagrams.
+
+    Per-router arrays are indexed like router_nodes; ibgp_idx holds each
+    tunnel's endpoints as indices into them.
+    """
+    router_nodes: list
+    router_labels: dict
+    router_prefixes: list
+    router_coords: np.ndarray
+    router_logical: np.ndarray
+    ibgp_edges: list
+    ibgp_idx: np.ndarray
+    edge_costs: list
+    dn42_peers: list
+    other_peers: list
+    peer_labels: dict
+    peer_to_router: dict
+    external_edges: list
+    segment_routing_enabled: bool
+
+
+def build_topology_model(routers, global_config):
+    """Collect router, tunnel and peer data once for both diagrams."""
+    router_nodes = [router["hostname"] for router in routers]
+    router_labels = {
+        router["hostname"]: f'{router["hostname"]}\n{router.get("loopback", "")}'
+        for router in routers
+    }
+    router_index = {hostname: i for i, hostname in enumerate(router_nodes)}
 
     # Collect internal tunnel data
     ibgp_edges = []
-    edge_info = {}
-
-    for tunnel in intra_network_tunnels:
+    edge_costs = []
+    for tunnel in global_config.get("intra_network_tunnels", []):
         router_pair = tunnel.get("routers", [])
         if len(router_pair) == 2:
             router_a, router_b = router_pair
-            if router_a in router_nodes and router_b in router_nodes:
+            if router_a in router_index and router_b in router_index:
                 ibgp_edges.append((router_a, router_b))
                 ospf_cost = tunnel.get("ospf_cost", "auto")
-                edge_info[(router_a, router_b)] = f"{ospf_cost}ms"
+                edge_costs.append(f"{ospf_cost}ms")
+
+    # Collect peer data
+    dn42_peers = []
+    other_peers = []
+    peer_labels = {}
+    external_edges = []
+    peer_to_router = {}
+
+    for router in routers:
+        hostname = router["hostname"]
+
+        # DN42 peers
+        for peer in router.get("peers", ()):
+            peer_name = peer["name"]
+            peer_asn = peer["asn"]
+            peer_id = f'{peer_name}_{peer_asn}'
+
+            dn42_peers.append(peer_id)
+            peer_labels[peer_id] = f"{peer_name}\nAS{peer_asn}"
+            peer_to_router[peer_id] = hostname
+
+            external_edges.append((hostname, peer_id))
+
+        # Non-DN42 peers
+        for peer in router.get("bgp_peers", ()):
+            peer_name = peer["name"]
+            peer_asn = peer["remote_as"]
+            peer_id = f'{peer_name}_{peer_asn}'
+
+            other_peers.append(peer_id)
+            peer_labels[peer_id] = f"{peer_name}\nAS{peer_asn}"
+            peer_to_router[peer_id] = hostname
+
+            external_edges.append((hostname, peer_id))
+
+    return TopologyModel(
+        router_nodes=router_nodes,
+        router_labels=router_labels,
+        router_prefixes=[router["_prefix"] for router in routers],
+        router_coords=np.array([get_router_coords(r) for r in routers],
+                               dtype=float).reshape(-1, 2),
+        router_logical=np.array([get_logical_position(r) for r in routers],
+                                dtype=float).reshape(-1, 2),
+        ibgp_edges=ibgp_edges,
+        ibgp_idx=np.array([[router_index[a], router_index[b]] for a, b in ibgp_edges],
+                          dtype=np.intp).reshape(-1, 2),
+        edge_costs=edge_costs,
+        dn42_peers=dn42_peers,
+        other_peers=other_peers,
+        peer_labels=peer_labels,
+        peer_to_router=peer_to_router,
+        external_edges=external_edges,
+        segment_routing_enabled=global_config.get("segment_routing_enabled", False),
+    )
+
+
+def generate_geo_map(model, output_file="topology-geo.png"):
+    """Generate geographic map showing internal network on a world map."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    try:
+        import cartopy.crs as ccrs
+        import cartopy.feature as cfeature
+        has_cartopy = True
+    except ImportError:
+        has_cartopy = False
+        print("Warning: cartopy not installed. Install with: pip install cartopy")
+        print("Geographic map will be simplified.")
+
+    router_nodes = model.router_nodes
+    router_labels = model.router_labels
+    ibgp_edges = model.ibgp_edges
+
+    # Router (lon, lat) pairs as an (R, 2) array, and tunnel segments as an
+    # (E, 2, 2) array of endpoints
+    router_lonlat = model.router_coords
+    ibgp_segments = router_lonlat[model.ibgp_idx]
 
     # Create figure with world map projection
-    if HAS_CARTOPY:
-        fig = plt.figure(figsize=(16, 7))
+    if has_cartopy:
+        fig = Figure(figsize=(16, 7))
+        FigureCanvasAgg(fig)
         # Use PlateCarree for simple lat/lon view with custom extent
         ax = fig.add_subplot(1, 1, 1, projection=ccrs.PlateCarree())
 
@@ -153,114 +355,66 @@ def generate_geo_map(routers, output_file="topology-geo.png"):
         ax.add_feature(cfeature.BORDERS, linewidth=0.3, edgecolor='#cccccc', linestyle=':')
 
         # Draw internal GRE edges as straight lines (PlateCarree)
-        for edge in ibgp_edges:
-            router_a, router_b = edge
-            lon_a, lat_a = router_positions_geo[router_a]
-            lon_b, lat_b = router_positions_geo[router_b]
-
-            ax.plot([lon_a, lon_b], [lat_a, lat_b],
-                   color='#1565c0', linewidth=3, alpha=0.8,
-                   transform=ccrs.PlateCarree(), zorder=2)
+        if ibgp_edges:
+            ax.add_collection(LineCollection(
+                ibgp_segments, colors='#1565c0', linewidths=3, alpha=0.8,
+                transform=ccrs.PlateCarree(), zorder=2
+            ))
 
         # Draw router nodes
-        for hostname in router_nodes:
-            lon, lat = router_positions_geo[hostname]
-            ax.scatter(lon, lat, c='#4a90e2', s=350, marker='s',
-                      edgecolors='black', linewidths=2,
-                      transform=ccrs.PlateCarree(), zorder=10)
+        ax.scatter(router_lonlat[:, 0], router_lonlat[:, 1], c='#4a90e2', s=350,
+                   marker='s', edgecolors='black', linewidths=2,
+                   transform=ccrs.PlateCarree(), zorder=10)
 
+        for hostname, prefix, (lon, lat) in zip(router_nodes, model.router_prefixes,
+                                                router_lonlat):
             # Adjust label position based on location to avoid overlap
-            prefix = hostname.split("-")[0].lower()
-            if prefix == "sgx":
-                # Singapore - put label to the left (inside the map)
-                label_offset_lon = -12
-                label_offset_lat = 0
-                ha = 'right'
-                va = 'center'
-            elif prefix == "frk":
-                # Frankfurt - put label to the right and up
-                label_offset_lon = 8
-                label_offset_lat = 5
-                ha = 'left'
-                va = 'bottom'
-            elif prefix == "lhr":
-                # London - put label to the left
-                label_offset_lon = -8
-                label_offset_lat = 3
-                ha = 'right'
-                va = 'bottom'
-            elif prefix == "lax":
-                # LA - put label below
-                label_offset_lon = 0
-                label_offset_lat = -8
-                ha = 'center'
-                va = 'top'
-            elif prefix == "ewr":
-                # Newark - put label below
-                label_offset_lon = 0
-                label_offset_lat = -8
-                ha = 'center'
-                va = 'top'
-            else:
-                label_offset_lon = 0
-                label_offset_lat = -8
-                ha = 'center'
-                va = 'top'
+            label_offset_lon, label_offset_lat, ha, va = GEO_LABEL_OFFSETS.get(
+                prefix, GEO_LABEL_OFFSETS_DEFAULT)
 
             ax.text(lon + label_offset_lon, lat + label_offset_lat, router_labels[hostname],
                    fontsize=9, ha=ha, va=va, fontweight='bold',
                    transform=ccrs.PlateCarree(),
-                   bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
-                            edgecolor='#4a90e2', alpha=0.95),
+                   bbox=ROUTER_LABEL_BBOX,
                    zorder=11)
 
-        # Draw edge labels - positioned directly on the links
-        for edge in ibgp_edges:
-            router_a, router_b = edge
-            lon_a, lat_a = router_positions_geo[router_a]
-            lon_b, lat_b = router_positions_geo[router_b]
-
-            # Position at midpoint of the edge
-            mid_lon = (lon_a + lon_b) / 2
-            mid_lat = (lat_a + lat_b) / 2
-
-            label_text = edge_info.get(edge, "")
+        # Draw edge labels - positioned directly on the links, at the midpoint
+        ibgp_midpoints = ibgp_segments.mean(axis=1)
+        for (mid_lon, mid_lat), label_text in zip(ibgp_midpoints, model.edge_costs):
             ax.text(mid_lon, mid_lat, label_text,
                    fontsize=7, ha='center', va='center',
                    transform=ccrs.PlateCarree(),
-                   bbox=dict(boxstyle='round,pad=0.15', facecolor='white',
-                            edgecolor='#1565c0', alpha=0.9),
+                   bbox=EDGE_LABEL_BBOX_GEO,
                    zorder=5)
 
     else:
         # Fallback without cartopy - simple plot
-        fig, ax = plt.subplots(figsize=(16, 9))
+        fig = Figure(figsize=(16, 9))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
 
         # Calculate extent based on router positions
-        all_lons = [pos[0] for pos in router_positions_geo.values()]
-        all_lats = [pos[1] for pos in router_positions_geo.values()]
+        min_lon, min_lat = router_lonlat.min(axis=0)
+        max_lon, max_lat = router_lonlat.max(axis=0)
         lon_margin = 20
         lat_margin = 15
 
-        ax.set_xlim(min(all_lons) - lon_margin, max(all_lons) + lon_margin)
-        ax.set_ylim(min(all_lats) - lat_margin, max(all_lats) + lat_margin)
+        ax.set_xlim(min_lon - lon_margin, max_lon + lon_margin)
+        ax.set_ylim(min_lat - lat_margin, max_lat + lat_margin)
         ax.set_facecolor('#e8f4fc')
 
-        for edge in ibgp_edges:
-            router_a, router_b = edge
-            lon_a, lat_a = router_positions_geo[router_a]
-            lon_b, lat_b = router_positions_geo[router_b]
-            ax.plot([lon_a, lon_b], [lat_a, lat_b],
-                   color='#1565c0', linewidth=3, alpha=0.8, zorder=2)
-
-        for hostname in router_nodes:
-            lon, lat = router_positions_geo[hostname]
-            ax.scatter(lon, lat, c='#4a90e2', s=300, marker='s',
-                      edgecolors='black', linewidths=2, zorder=10)
+        if ibgp_edges:
+            ax.add_collection(LineCollection(
+                ibgp_segments, colors='#1565c0', linewidths=3, alpha=0.8, zorder=2
+            ))
+
+        ax.scatter(router_lonlat[:, 0], router_lonlat[:, 1], c='#4a90e2', s=300,
+                   marker='s', edgecolors='black', linewidths=2, zorder=10)
+
+        for hostname, (lon, lat) in zip(router_nodes, router_lonlat):
             ax.text(lon, lat - 5, router_labels[hostname],
                    fontsize=9, ha='center', va='top', fontweight='bold',
-                   bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
-                            edgecolor='#4a90e2', alpha=0.95),
+                   bbox=ROUTER_LABEL_BBOX,
                    zorder=11)
 
     ax.set_title(f"AS{USMAN_ASN} - Geographic Network View\n(iBGP + OSPF + LDP over GRE)",
@@ -276,119 +430,61 @@ def generate_geo_map(routers, output_file="topology-geo.png"):
     ax.legend(handles=geo_legend_elements, loc='lower left', fontsize=9,
              framealpha=0.95, edgecolor='#333333')
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     # Save
     output_path = Path(__file__).parent.parent / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    fig.savefig(output_path, dpi=TOPOLOGY_DPI, facecolor='white', **PNG_SAVE_KWARGS)
     print(f"Geographic topology saved to: {output_path}")
-    plt.close()
 
     return output_path
 
 
-def generate_logical_diagram(routers, output_file="topology-logical.png"):
+def generate_logical_diagram(model, output_file="topology-logical.png"):
     """Generate logical topology diagram showing full network with geographic-like layout."""
-
-    global_config = load_global_config()
-    intra_network_tunnels = global_config.get("intra_network_tunnels", [])
-    segment_routing_enabled = global_config.get("segment_routing_enabled", False)
-    sr_label = "+SR" if segment_routing_enabled else ""
-
-    # Collect router data with fixed positions
-    router_nodes = []
-    router_labels = {}
-    pos = {}
-
-    for router in routers:
-        hostname = router["hostname"]
-        loopback = router.get("loopback", "")
-        router_nodes.append(hostname)
-        router_labels[hostname] = f"{hostname}\n{loopback}"
-        pos[hostname] = np.array(get_logical_position(hostname))
-
-    # Collect internal tunnel data
-    ibgp_edges = []
-    edge_labels_internal = {}
-
-    for tunnel in intra_network_tunnels:
-        router_pair = tunnel.get("routers", [])
-        if len(router_pair) == 2:
-            router_a, router_b = router_pair
-            if router_a in router_nodes and router_b in router_nodes:
-                ibgp_edges.append((router_a, router_b))
-                ospf_cost = tunnel.get("ospf_cost", "auto")
-                edge_labels_internal[(router_a, router_b)] = f"{ospf_cost}ms"
-
-    # Collect peer data
-    dn42_peers = []
-    other_peers = []
-    peer_labels = {}
-    external_edges = []
-    edge_labels_external = {}
-    peer_to_router = {}
-
-    for router in routers:
-        hostname = router["hostname"]
-
-        # DN42 peers
-        if "peers" in router:
-            for peer in router["peers"]:
-                peer_name = peer["name"]
-                peer_asn = peer["asn"]
-                peer_id = f'{peer_name}_{peer_asn}'
-                country = peer.get("iso_3166_country_code", "GB")
-
-                dn42_peers.append(peer_id)
-                peer_labels[peer_id] = f"{peer_name}\nAS{peer_asn}"
-                peer_to_router[peer_id] = hostname
-
-                external_edges.append((hostname, peer_id))
-                latency_ms = int(peer["latency_us"]) / 1000
-                edge_labels_external[(hostname, peer_id)] = f"{latency_ms:.0f}ms"
-
-        # Non-DN42 peers
-        if "bgp_peers" in router:
-            for peer in router["bgp_peers"]:
-                peer_name = peer["name"]
-                peer_asn = peer["remote_as"]
-                peer_id = f'{peer_name}_{peer_asn}'
-                peer_type = peer.get("type", "unknown")
-
-                other_peers.append(peer_id)
-                peer_labels[peer_id] = f"{peer_name}\nAS{peer_asn}"
-                peer_to_router[peer_id] = hostname
-
-                external_edges.append((hostname, peer_id))
-                edge_labels_external[(hostname, peer_id)] = ""
-
-    # Calculate center of router positions
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import matplotlib.patches as mpatches
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    sr_label = "+SR" if model.segment_routing_enabled else ""
+
+    router_nodes = model.router_nodes
+    router_labels = model.router_labels
+    ibgp_edges = model.ibgp_edges
+    dn42_peers = model.dn42_peers
+    other_peers = model.other_peers
+    peer_labels = model.peer_labels
+    external_edges = model.external_edges
+
+    # Routers sit at fixed positions; peers are placed around them below
+    router_positions_arr = model.router_logical
+    pos = dict(zip(router_nodes, router_positions_arr))
+
+    # Calculate center of router positions, and the angle pointing from it to
+    # each router (peers go on the outside)
+    router_index = {r: i for i, r in enumerate(router_nodes)}
     if router_nodes:
-        router_positions_arr = np.array([pos[r] for r in router_nodes])
         router_center = router_positions_arr.mean(axis=0)
+        directions = router_positions_arr - router_center
+        base_angles = np.arctan2(directions[:, 1], directions[:, 0])
 
     # Position peers around their connected routers
     # Group peers by router
-    peers_by_router = {}
+    peers_by_router = defaultdict(list)
     for peer_id in dn42_peers + other_peers:
-        router = peer_to_router.get(peer_id)
+        router = model.peer_to_router.get(peer_id)
         if router:
-            if router not in peers_by_router:
-                peers_by_router[router] = []
             peers_by_router[router].append(peer_id)
 
-    # Position each router's peers in a fan around it
+    # Position each router's peers in a fan around it: collect every peer's
+    # parent router and angle, then place them all in one array operation
+    peer_ids = []
+    parent_idx = []
+    peer_angles = []
     for router, peers in peers_by_router.items():
-        router_pos = pos[router]
-        # Direction from center to router (peers go on the outside)
-        direction = router_pos - router_center
-        if np.linalg.norm(direction) > 0:
-            direction = direction / np.linalg.norm(direction)
-        else:
-            direction = np.array([1, 0])
-
-        # Base angle in the direction away from center
-        base_angle = np.arctan2(direction[1], direction[0])
+        base_angle = base_angles[router_index[router]]
 
         # Spread peers in a fan
         n_peers = len(peers)
@@ -399,40 +495,37 @@ def generate_logical_diagram(routers, output_file="topology-logical.png"):
             spread = np.pi / 1.5
             angles = np.linspace(base_angle - spread/2, base_angle + spread/2, n_peers)
 
-        peer_distance = 0.45  # Distance from router to peer
-
-        for i, peer_id in enumerate(peers):
-            angle = angles[i]
-            pos[peer_id] = router_pos + peer_distance * np.array([np.cos(angle), np.sin(angle)])
+        peer_ids.extend(peers)
+        parent_idx.extend([router_index[router]] * n_peers)
+        peer_angles.extend(angles)
 
-    # Create graph
-    G = nx.Graph()
-    for hostname in router_nodes:
-        G.add_node(hostname)
-    for peer_id in dn42_peers + other_peers:
-        G.add_node(peer_id)
-    for edge in ibgp_edges:
-        G.add_edge(edge[0], edge[1])
-    for edge in external_edges:
-        G.add_edge(edge[0], edge[1])
+    if peer_ids:
+        peer_distance = 0.45  # Distance from router to peer
+        peer_angles = np.array(peer_angles)
+        peer_xy = router_positions_arr[parent_idx] + peer_distance * np.column_stack(
+            (np.cos(peer_angles), np.sin(peer_angles))
+        )
+        pos.update(zip(peer_ids, peer_xy))
 
     # Create figure
-    fig, ax = plt.subplots(figsize=(16, 10))
+    fig = Figure(figsize=(16, 10))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
 
-    # Draw internal zone (MPLS/LDP domain) - use a rounded rectangle
+    # Draw internal zone (MPLS/LDP domain) - a plain rectangle keeps the path
+    # down to four vertices
     if router_nodes:
-        router_xs = [pos[r][0] for r in router_nodes]
-        router_ys = [pos[r][1] for r in router_nodes]
-        padding = 0.25
+        rx_min, ry_min = router_positions_arr.min(axis=0)
+        rx_max, ry_max = router_positions_arr.max(axis=0)
+        padding = 0.3
 
-        rect_x = min(router_xs) - padding
-        rect_y = min(router_ys) - padding
-        rect_width = max(router_xs) - min(router_xs) + 2 * padding
-        rect_height = max(router_ys) - min(router_ys) + 2 * padding
+        rect_x = rx_min - padding
+        rect_y = ry_min - padding
+        rect_width = rx_max - rx_min + 2 * padding
+        rect_height = ry_max - ry_min + 2 * padding
 
-        internal_zone = mpatches.FancyBboxPatch(
+        internal_zone = mpatches.Rectangle(
             (rect_x, rect_y), rect_width, rect_height,
-            boxstyle=mpatches.BoxStyle("Round", pad=0.05, rounding_size=0.15),
             facecolor='#e3f2fd', alpha=0.6, zorder=0,
             linestyle='--', linewidth=2, edgecolor='#1976d2'
         )
@@ -441,90 +534,84 @@ def generate_logical_diagram(routers, output_file="topology-logical.png"):
         # Label for the domain
         ax.annotate(
             f'AS{USMAN_ASN} - MPLS/LDP Domain',
-            xy=(rect_x + rect_width / 2, rect_y - 0.05),
+            xy=(rect_x + rect_width / 2, rect_y),
             ha='center', va='top',
             fontsize=11, fontweight='bold', color='#1976d2',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='white', edgecolor='#1976d2', alpha=0.95)
+            bbox=DOMAIN_LABEL_BBOX
         )
 
     # Draw external edges first (behind nodes)
     if external_edges:
-        nx.draw_networkx_edges(
-            G, pos, edgelist=external_edges,
-            width=1.5, alpha=0.5, edge_color='#888888',
-            style='dashed', ax=ax
-        )
+        ax.add_collection(LineCollection(
+            np.array([[pos[a], pos[b]] for a, b in external_edges]),
+            colors='#888888', linewidths=1.5, alpha=0.5,
+            linestyles='dashed', zorder=1
+        ))
 
     # Draw internal edges
+    ibgp_segments = router_positions_arr[model.ibgp_idx]
     if ibgp_edges:
-        nx.draw_networkx_edges(
-            G, pos, edgelist=ibgp_edges,
-            width=4, alpha=0.9, edge_color='#1565c0',
-            style='solid', ax=ax
-        )
-
-    # Draw router nodes
-    nx.draw_networkx_nodes(
-        G, pos, nodelist=router_nodes,
-        node_color='#4a90e2', node_size=4500,
-        node_shape='o', edgecolors='black', linewidths=2,
-        ax=ax
-    )
-
-    # Draw DN42 peer nodes
-    if dn42_peers:
-        nx.draw_networkx_nodes(
-            G, pos, nodelist=dn42_peers,
-            node_color='#66bb6a', node_size=1800,
-            node_shape='o', edgecolors='black', linewidths=1.5,
-            ax=ax
+        ax.add_collection(LineCollection(
+            ibgp_segments,
+            colors='#1565c0', linewidths=4, alpha=0.9,
+            linestyles='solid', zorder=1
+        ))
+
+    # Draw router and DN42 peer nodes (both circles) as a single collection
+    circle_nodes = router_nodes + dn42_peers
+    if circle_nodes:
+        n_routers, n_dn42 = len(router_nodes), len(dn42_peers)
+        circle_xy = np.array([pos[n] for n in circle_nodes])
+        ax.scatter(
+            circle_xy[:, 0], circle_xy[:, 1],
+            c=['#4a90e2'] * n_routers + ['#66bb6a'] * n_dn42,
+            s=[4500] * n_routers + [1800] * n_dn42,
+            marker='o', edgecolors='black',
+            linewidths=[2] * n_routers + [1.5] * n_dn42,
+            zorder=2
         )
 
     # Draw non-DN42 peer nodes
     if other_peers:
-        nx.draw_networkx_nodes(
-            G, pos, nodelist=other_peers,
-            node_color='#ffa726', node_size=1500,
-            node_shape='D', edgecolors='black', linewidths=1.5,
-            ax=ax
+        other_xy = np.array([pos[n] for n in other_peers])
+        ax.scatter(
+            other_xy[:, 0], other_xy[:, 1],
+            c='#ffa726', s=1500, marker='D',
+            edgecolors='black', linewidths=1.5,
+            zorder=2
         )
 
     # Draw labels for routers (inside the node)
-    nx.draw_networkx_labels(
-        G, pos, labels={h: router_labels[h] for h in router_nodes},
-        font_size=8, font_weight='bold',
-        ax=ax
-    )
+    for hostname in router_nodes:
+        x, y = pos[hostname]
+        ax.text(x, y, router_labels[hostname], fontsize=8, fontweight='bold',
+               ha='center', va='center', clip_on=True)
 
     # Draw labels for peers
-    nx.draw_networkx_labels(
-        G, pos, labels=peer_labels,
-        font_size=7, font_weight='normal',
-        ax=ax
-    )
-
-    # Draw edge labels (internal) - position along the edge
-    for edge, label in edge_labels_internal.items():
-        x1, y1 = pos[edge[0]]
-        x2, y2 = pos[edge[1]]
-        # Position at 40% along the edge
-        t = 0.4
-        mx = x1 + t * (x2 - x1)
-        my = y1 + t * (y2 - y1)
+    for peer_id, label in peer_labels.items():
+        x, y = pos[peer_id]
+        ax.text(x, y, label, fontsize=7, fontweight='normal',
+               ha='center', va='center', clip_on=True)
+
+    # Draw edge labels (internal) - position at 40% along the edge
+    t = 0.4
+    label_points = ibgp_segments[:, 0] + t * (ibgp_segments[:, 1] - ibgp_segments[:, 0])
+    for (mx, my), label in zip(label_points, model.edge_costs):
         ax.text(mx, my, label, fontsize=7, ha='center', va='center',
                color='#1565c0', fontweight='bold',
-               bbox=dict(boxstyle='round,pad=0.1', facecolor='white', edgecolor='none', alpha=0.9))
+               bbox=EDGE_LABEL_BBOX_LOGICAL)
 
     ax.set_title(f"AS{USMAN_ASN} - Logical Network Topology",
                 fontsize=14, fontweight='bold', pad=15)
     ax.axis('off')
 
     # Set axis limits with margin
-    all_x = [p[0] for p in pos.values()]
-    all_y = [p[1] for p in pos.values()]
+    pos_arr = np.stack(list(pos.values()))
+    xy_min = pos_arr.min(axis=0)
+    xy_max = pos_arr.max(axis=0)
     margin = 0.3
-    ax.set_xlim(min(all_x) - margin, max(all_x) + margin)
-    ax.set_ylim(min(all_y) - margin - 0.15, max(all_y) + margin)
+    ax.set_xlim(xy_min[0] - margin, xy_max[0] + margin)
+    ax.set_ylim(xy_min[1] - margin - 0.15, xy_max[1] + margin)
 
     # Legend
     logical_legend_elements = [
@@ -544,26 +631,55 @@ def generate_logical_diagram(routers, output_file="topology-logical.png"):
     ax.legend(handles=logical_legend_elements, loc='lower left', fontsize=9,
              framealpha=0.95, edgecolor='#333333', ncol=2)
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     # Save
     output_path = Path(__file__).parent.parent / output_file
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    fig.savefig(output_path, dpi=TOPOLOGY_DPI, facecolor='white', **PNG_SAVE_KWARGS)
     print(f"Logical topology saved to: {output_path}")
-    plt.close()
 
     return output_path
 
 
+def topology_fingerprint(routers, global_config):
+    """Hash everything the diagrams are drawn from: inventory, script and settings."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(Path(__file__).read_bytes())
+    has_cartopy = importlib.util.find_spec("cartopy") is not None
+    h.update(f"dpi={TOPOLOGY_DPI};cartopy={has_cartopy}".encode())
+    h.update(json.dumps(global_config, sort_keys=True, default=str).encode())
+    for router in routers:
+        h.update(json.dumps(router, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
 def main():
     """Generate both topology diagrams."""
     try:
         routers = load_inventory()
-
-        # Generate both diagrams
-        generate_geo_map(routers, "topology-geo.png")
-        generate_logical_diagram(routers, "topology-logical.png")
-
+        global_config = load_global_config()
+
+        # Skip rendering when nothing feeding the diagrams has changed since
+        # the last run (delete .topology.hash to force a rebuild)
+        base_path = Path(__file__).parent.parent
+        hash_file = base_path / ".topology.hash"
+        output_files = ("topology-geo.png", "topology-logical.png")
+        fingerprint = topology_fingerprint(routers, global_config)
+        if (all((base_path / f).exists() for f in output_files)
+                and hash_file.exists()
+                and hash_file.read_text().strip() == fingerprint):
+            print("Inventory unchanged; topology diagrams are up to date.")
+            return
+
+        model = build_topology_model(routers, global_config)
+
+        # Generate both diagrams under one shared rendering configuration
+        import matplotlib
+        with matplotlib.rc_context(RENDER_RC_PARAMS):
+            generate_geo_map(model, "topology-geo.png")
+            generate_logical_diagram(model, "topology-logical.png")
+
+        hash_file.write_text(fingerprint + "\n")
         print("\nBoth diagrams generated successfully!")
 
     except Exception as e: